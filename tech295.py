@@ -1,15 +1,13 @@
 import networkx as nx
 import asyncio
-import random
-import time
-import matplotlib.pyplot as plt
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-from datetime import datetime
 from collections import defaultdict
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 
-@dataclass
+@dataclass(slots=True)
 class NetworkNode:
     """Represents a node in the network with its properties."""
     name: str
@@ -17,121 +15,231 @@ class NetworkNode:
     is_router: bool = False
     area_id: int = 0  # OSPF area ID
 
+# Static topology with 7 nodes (4 routers, 3 regular nodes):
+# (name, ip_address, is_router, area_id, x, y)
+_STATIC_NODES = (
+    ('R1', '192.168.1.0', True, 0, 0, 2),  # Router 1
+    ('R2', '192.168.1.1', True, 1, 2, 2),  # Router 2
+    ('R3', '192.168.1.2', True, 2, 2, 0),  # Router 3
+    ('R4', '192.168.1.3', True, 2, 0, 0),  # Router 4
+    ('N1', '192.168.1.4', False, 0, 1, 3),  # Node 1
+    ('N2', '192.168.1.5', False, 1, 3, 1),  # Node 2
+    ('N3', '192.168.1.6', False, 2, 1, -1),  # Node 3
+)
+_STATIC_EDGES = (
+    ('R1', 'R2'), ('R2', 'R3'), ('R3', 'R4'), ('R4', 'R1'),  # Router backbone
+    ('R1', 'N1'), ('R2', 'N2'), ('R3', 'N3'),  # Router to node connections
+)
+
 class NetworkSimulator:
     """Simulates a dynamic computer network with OSPF routing and visualization."""
     
     def __init__(self):
         """Initialize the network simulator with a structured topology."""
-        self.graph = nx.Graph()
+        # NetworkX view of the topology, only built when something draws it
+        self._graph: Optional[nx.Graph] = None
         self.nodes: Dict[str, NetworkNode] = {}
-        self.latencies: Dict[Tuple[str, str], float] = {}
-        self.ospf_costs: Dict[Tuple[str, str], float] = {}
+        # Keyed by frozenset({u, v}) since links are undirected
+        self.latencies: Dict[frozenset, float] = {}
+        self.ospf_costs: Dict[frozenset, int] = {}
+        # Bumped on every latency refresh; shortest-path trees are recomputed lazily when stale
+        self._topology_version = 0
+        self._apsp_version = -1
+        self._dist: Optional[np.ndarray] = None
+        self._preds: Optional[np.ndarray] = None
+        # Routes are reconstructed on first request and stored immutably (tuple path,
+        # read-only edge ids); they are copied at the public boundary
+        self._apsp_paths: Dict[Tuple[str, str], Tuple[Tuple[str, ...], np.ndarray]] = {}
+        self._rng = np.random.default_rng()
         self._initialize_network()
+        self._label_cache_version = -1
+        self._label_cache: Dict[Tuple[str, str], str] = {}
         self._running = True
         
     def _initialize_network(self) -> None:
         """Create a structured network topology with 7 nodes (4 routers, 3 regular nodes)."""
-        # Define node positions in a structured way
-        node_positions = {
-            'R1': (0, 2),  # Router 1
-            'R2': (2, 2),  # Router 2
-            'R3': (2, 0),  # Router 3
-            'R4': (0, 0),  # Router 4
-            'N1': (1, 3),  # Node 1
-            'N2': (3, 1),  # Node 2
-            'N3': (1, -1)  # Node 3
-        }
+        # Area IDs never change, so group nodes by area once for visualization
+        self._nodes_by_area: Dict[int, List[str]] = defaultdict(list)
+        
+        # Node positions never change, so keep them for visualization
+        self._pos: Dict[str, Tuple[int, int]] = {}
         
         # Create nodes
-        for node_name, (x, y) in node_positions.items():
-            ip_address = f"192.168.1.{len(self.nodes)}"
-            is_router = node_name.startswith('R')
-            area_id = 0 if node_name in ['R1', 'N1'] else (1 if node_name in ['R2', 'N2'] else 2)
-            node = NetworkNode(node_name, ip_address, is_router, area_id)
-            self.nodes[node_name] = node
-            self.graph.add_node(node_name, pos=(x, y))
-        
-        # Create connections (edges)
-        connections = [
-            ('R1', 'R2'), ('R2', 'R3'), ('R3', 'R4'), ('R4', 'R1'),  # Router backbone
-            ('R1', 'N1'), ('R2', 'N2'), ('R3', 'N3')  # Router to node connections
-        ]
-        
-        for u, v in connections:
-            self.graph.add_edge(u, v)
-            # Initialize latency between 10-50ms for better simulation
-            latency = random.uniform(10, 50)
-            self.latencies[(u, v)] = latency
-            self.latencies[(v, u)] = latency
-            # Calculate OSPF cost
-            cost = int(100 / (latency / 10))
-            self.ospf_costs[(u, v)] = cost
-            self.ospf_costs[(v, u)] = cost
+        for node_name, ip_address, is_router, area_id, x, y in _STATIC_NODES:
+            self.nodes[node_name] = NetworkNode(node_name, ip_address, is_router, area_id)
+            self._nodes_by_area[area_id].append(node_name)
+            self._pos[node_name] = (x, y)
+        self._router_nodes = [node for node in self.nodes if self.nodes[node].is_router]
+        self._area_id: Dict[str, int] = {name: node.area_id for name, node in self.nodes.items()}
+        
+        # Fixed node indexing for the adjacency list and routing arrays
+        self._idx_to_name: List[str] = list(self.nodes)
+        self._name_to_idx: Dict[str, int] = {name: i for i, name in enumerate(self._idx_to_name)}
+        
+        # Create connections (edges); link metrics are stored as parallel arrays
+        # indexed by a stable edge id, and self._adj[node_idx] lists the
+        # (neighbor_idx, edge_id) pairs for each node
+        self._edge_idx: Dict[frozenset, int] = {}
+        self._adj: List[List[Tuple[int, int]]] = [[] for _ in self._idx_to_name]
+        # Edge id of each directed arc (u_idx, v_idx), for walking predecessor trees
+        self._arc_edge_idx: Dict[Tuple[int, int], int] = {}
+        for edge_id, (u, v) in enumerate(_STATIC_EDGES):
+            self._edge_idx[frozenset((u, v))] = edge_id
+            u_idx, v_idx = self._name_to_idx[u], self._name_to_idx[v]
+            self._adj[u_idx].append((v_idx, edge_id))
+            self._adj[v_idx].append((u_idx, edge_id))
+            self._arc_edge_idx[(u_idx, v_idx)] = edge_id
+            self._arc_edge_idx[(v_idx, u_idx)] = edge_id
+        
+        # Initialize latency between 10-50ms for better simulation
+        self._latency = self._rng.uniform(10, 50, size=len(_STATIC_EDGES))
+        self._cost = np.empty(len(_STATIC_EDGES), dtype=np.int32)
+        self._cost_tmp = np.empty(len(_STATIC_EDGES), dtype=np.float64)  # scratch for cost updates
+        
+        self._recompute_costs()
+        self._build_ospf_matrix()
+        self._sync_link_metrics()
+    
+    def _build_ospf_matrix(self) -> None:
+        """Build a CSR adjacency matrix of OSPF costs from the adjacency list.
+        
+        The topology never changes, only the weights do, so the matrix structure
+        is built once and ``self._weights`` (its data buffer) is updated in place.
+        """
+        n = len(self._adj)
+        
+        # One directed arc per edge direction, in row-major order as CSR requires
+        arcs = [(row, col, edge_id) for row in range(n) for col, edge_id in sorted(self._adj[row])]
+        self._indices = np.array([col for _, col, _ in arcs], dtype=np.int32)
+        self._indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum([len(neighbors) for neighbors in self._adj], out=self._indptr[1:])
+        
+        # Edge id behind each directed arc, so costs can be scattered into the CSR data
+        self._arc_edge = np.array([edge_id for _, _, edge_id in arcs], dtype=np.intp)
+        self._weights = np.empty(len(arcs), dtype=np.float64)
+        self._weights[:] = self._cost[self._arc_edge]
+        
+        self._csr = csr_matrix((self._weights, self._indices, self._indptr), shape=(n, n), copy=False)
+    
+    @property
+    def graph(self) -> nx.Graph:
+        """NetworkX view of the topology, built on first use for visualization."""
+        if self._graph is None:
+            self._graph = nx.Graph()
+            for node_name, pos in self._pos.items():
+                self._graph.add_node(node_name, pos=pos)
+            self._graph.add_edges_from(_STATIC_EDGES)
+        return self._graph
+    
+    def _sync_link_metrics(self) -> None:
+        """Refresh the ``latencies`` and ``ospf_costs`` dicts from the edge arrays.
+        
+        The arrays are the source of truth; the dicts are only brought up to date
+        when something is about to read them (e.g. ``visualize_network``).
+        """
+        for key, edge_id in self._edge_idx.items():
+            self.latencies[key] = float(self._latency[edge_id])
+            self.ospf_costs[key] = int(self._cost[edge_id])
+    
+    def _recompute_costs(self) -> None:
+        """Calculate the OSPF cost, 100 / (latency / 10), of every link in one pass."""
+        np.floor_divide(1000.0, self._latency, out=self._cost_tmp)
+        self._cost[:] = self._cost_tmp
+    
+    def _lat(self, u: str, v: str) -> float:
+        """Return the current latency of the link between two nodes."""
+        return float(self._latency[self._edge_idx[frozenset((u, v))]])
+    
+    def _link_cost(self, u: str, v: str) -> int:
+        """Return the current OSPF cost of the link between two nodes."""
+        return int(self._cost[self._edge_idx[frozenset((u, v))]])
     
     async def update_latencies(self) -> None:
         """Periodically update link latencies to simulate dynamic network conditions."""
         while self._running:
-            for edge in self.graph.edges():
-                # Randomly adjust latency by ±10% (smaller variation for stability)
-                current_latency = self.latencies[edge]
-                new_latency = current_latency * random.uniform(0.9, 1.1)
-                self.latencies[edge] = new_latency
-                self.latencies[(edge[1], edge[0])] = new_latency
-                # Update OSPF costs
-                cost = int(100 / (new_latency / 10))
-                self.ospf_costs[edge] = cost
-                self.ospf_costs[(edge[1], edge[0])] = cost
+            # Randomly adjust latency by ±10% (smaller variation for stability)
+            factors = self._rng.uniform(0.9, 1.1, size=self._latency.size)
+            self._latency *= factors
+            self._recompute_costs()
+            self._weights[:] = self._cost[self._arc_edge]
+            # Costs changed, so previously computed paths may no longer be shortest
+            self._topology_version += 1
             await asyncio.sleep(5)  # Update every 5 seconds
     
     def get_ospf_path(self, source: str, destination: str) -> List[str]:
         """Calculate the OSPF shortest path based on link costs."""
-        try:
-            # Create a weighted graph for OSPF path calculation
-            ospf_graph = nx.Graph()
-            for edge in self.graph.edges():
-                ospf_graph.add_edge(edge[0], edge[1], weight=self.ospf_costs[edge])
-            
-            # Calculate shortest path using Dijkstra's algorithm (OSPF)
-            path = nx.shortest_path(ospf_graph, source, destination, weight='weight')
-            return path
-        except nx.NetworkXNoPath:
+        # Hand out a copy so callers can't corrupt the cached route
+        return list(self._get_route(source, destination)[0])
+    
+    def _get_route(self, source: str, destination: str) -> Tuple[Tuple[str, ...], np.ndarray]:
+        """Return the OSPF path between two nodes and the edge ids along it."""
+        if self._apsp_version != self._topology_version:
+            self._compute_all_routes()
+        
+        route = self._apsp_paths.get((source, destination))
+        if route is not None:
+            return route
+        
+        src_idx = self._name_to_idx.get(source)
+        dst_idx = self._name_to_idx.get(destination)
+        if src_idx is None or dst_idx is None or np.isinf(self._dist[src_idx, dst_idx]):
             raise ValueError(f"No OSPF path found between {source} and {destination}")
+        
+        # Walk the predecessor tree back from the destination
+        path = [destination]
+        edge_ids = []
+        idx = dst_idx
+        while idx != src_idx:
+            pred = self._preds[src_idx, idx]
+            edge_ids.append(self._arc_edge_idx[(pred, idx)])
+            path.append(self._idx_to_name[pred])
+            idx = pred
+        path.reverse()
+        edge_ids.reverse()
+        edge_ids = np.array(edge_ids, dtype=np.int32)
+        edge_ids.flags.writeable = False
+        
+        route = (tuple(path), edge_ids)
+        self._apsp_paths[(source, destination)] = route
+        return route
+    
+    def _compute_all_routes(self) -> None:
+        """Recompute shortest-path trees from every node for the current costs.
+        
+        Individual routes are reconstructed from the predecessor matrix on demand.
+        """
+        # Calculate shortest paths using Dijkstra's algorithm (OSPF) from every source
+        self._dist, self._preds = dijkstra(self._csr, return_predecessors=True)
+        self._apsp_paths.clear()
+        self._apsp_version = self._topology_version
     
     async def ping(self, source: str, destination: str, count: int = 4) -> Tuple[List[float], List[str]]:
         """Simulate ICMP ping between two nodes using OSPF path."""
         if source not in self.nodes or destination not in self.nodes:
             raise ValueError("Source or destination node not found")
         
-        rtts = []
-        path = self.get_ospf_path(source, destination)
-        
-        for _ in range(count):
-            try:
-                # Simulate packet loss (1% chance)
-                if random.random() < 0.01:
-                    raise TimeoutError("Request timed out")
-                
-                # Calculate total latency along OSPF path
-                total_latency = sum(
-                    self.latencies[(path[i], path[i+1])] 
-                    for i in range(len(path)-1)
-                )
-                
-                # Add some jitter (±2ms)
-                rtt = total_latency + random.uniform(-2, 2)
-                rtts.append(max(0, rtt))  # Ensure non-negative RTT
-                
-                # Simulate network processing time
-                await asyncio.sleep(0.1)
-                
-            except TimeoutError:
-                rtts.append(None)
+        path, edge_ids = self._get_route(source, destination)
+        
+        # Calculate total latency along OSPF path
+        total_latency = self._latency[edge_ids].sum()
+        
+        # Draw jitter (±2ms) and packet loss (1% chance) for every request up front
+        jitters = self._rng.uniform(-2.0, 2.0, size=count)
+        losses = self._rng.random(count) < 0.01
+        rtts = np.maximum(0.0, total_latency + jitters)  # Ensure non-negative RTT
+        rtts = np.where(losses, np.nan, rtts)
+        
+        async def _one_ping(rtt: float) -> Optional[float]:
+            if np.isnan(rtt):
                 print(f"Request timed out")
-            except Exception as e:
-                print(f"Error during ping: {e}")
-                rtts.append(None)
+                return None
+            # Simulate network processing time
+            await asyncio.sleep(0.1)
+            return float(rtt)
         
-        return rtts, path
+        # Replies are independent, so wait for them concurrently
+        replies = await asyncio.gather(*[_one_ping(rtt) for rtt in rtts])
+        return list(replies), list(path)
     
     async def traceroute(self, source: str, destination: str) -> Tuple[List[Tuple[str, float]], List[str]]:
         """Simulate traceroute between two nodes using OSPF path."""
@@ -139,20 +247,16 @@ class NetworkSimulator:
             raise ValueError("Source or destination node not found")
         
         try:
-            path = self.get_ospf_path(source, destination)
-            hops = []
+            path, edge_ids = self._get_route(source, destination)
+            hop_latencies = self._latency[edge_ids].tolist()
+            hops = list(zip(path, hop_latencies))
             
-            for i in range(len(path)-1):
-                current = path[i]
-                next_hop = path[i+1]
-                latency = self.latencies[(current, next_hop)]
-                hops.append((current, latency))
-                # Simulate network processing time
-                await asyncio.sleep(0.1)
+            # Simulate network processing time for every hop in a single wait
+            await asyncio.sleep(0.1 * len(hop_latencies))
             
             # Add final hop
             hops.append((destination, 0))
-            return hops, path
+            return hops, list(path)
             
         except Exception as e:
             print(f"Error during traceroute: {e}")
@@ -160,10 +264,11 @@ class NetworkSimulator:
 
     def visualize_network(self, highlight_path: List[str] = None) -> None:
         """Visualize the network topology with OSPF areas and current latencies."""
-        plt.figure(figsize=(12, 8))
+        # Imported lazily so headless ping/traceroute runs don't pay for matplotlib
+        import matplotlib.pyplot as plt
         
-        # Get node positions from the graph
-        pos = nx.get_node_attributes(self.graph, 'pos')
+        plt.figure(figsize=(12, 8))
+        pos = self._pos
         
         # Define colors for different OSPF areas
         area_colors = {
@@ -174,22 +279,22 @@ class NetworkSimulator:
         
         # Draw nodes by OSPF area
         for area_id in area_colors:
-            area_nodes = [node for node in self.nodes 
-                         if self.nodes[node].area_id == area_id]
-            nx.draw_networkx_nodes(self.graph, pos, nodelist=area_nodes,
+            nx.draw_networkx_nodes(self.graph, pos, nodelist=self._nodes_by_area[area_id],
                                  node_color=area_colors[area_id],
                                  node_size=1000,
                                  label=f'Area {area_id}')
         
         # Draw routers with a different style
-        router_nodes = [node for node in self.nodes if self.nodes[node].is_router]
-        nx.draw_networkx_nodes(self.graph, pos, nodelist=router_nodes,
+        nx.draw_networkx_nodes(self.graph, pos, nodelist=self._router_nodes,
                              node_color='red', node_size=1200,
                              node_shape='s', label='Routers')
         
-        # Draw edges with latency and OSPF cost labels
-        edge_labels = {(u, v): f"{self.latencies[(u, v)]:.1f}ms\nCost: {self.ospf_costs[(u, v)]}" 
-                      for u, v in self.graph.edges()}
+        # Draw edges with latency and OSPF cost labels, rebuilt only when metrics changed
+        if self._label_cache_version != self._topology_version:
+            self._sync_link_metrics()
+            self._label_cache = {(u, v): f"{self._lat(u, v):.1f}ms\nCost: {self._link_cost(u, v)}" 
+                                 for u, v in self.graph.edges()}
+            self._label_cache_version = self._topology_version
         
         # Draw all edges
         nx.draw_networkx_edges(self.graph, pos, width=2)
@@ -203,7 +308,7 @@ class NetworkSimulator:
         
         # Add labels
         nx.draw_networkx_labels(self.graph, pos, font_size=12, font_weight='bold')
-        nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_labels,
+        nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=self._label_cache,
                                    font_size=8)
         
         plt.title("Network Topology with OSPF Areas and Link Metrics", pad=20)
@@ -258,7 +363,7 @@ async def main():
         print("\nHop\tNode\t\tLatency\t\tArea")
         print("-" * 50)
         for i, (hop, latency) in enumerate(hops, 1):
-            area_id = network.nodes[hop].area_id
+            area_id = network._area_id[hop]
             print(f"{i}\t{hop}\t\t{latency:.2f}ms\t\tArea {area_id}")
         
         # Visualize network with highlighted OSPF path